@@ -6,20 +6,49 @@ Just open this file in PyCharm and run it.
 It will produce a Parquet file and print the first 20 rows.
 """
 
+import os
 import re
+import sys
+from functools import lru_cache
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # === EDIT THESE PATHS FOR YOUR ENVIRONMENT ===
 INPUT_XLSX = "proc_he_codes.xlsx"
 OUTPUT_PARQUET = "proc_he_codes.parquet"
+COMPRESSION = None  # None (uncompressed), "zstd" (level 1) or "snappy"
+MAX_WORKERS = 1  # 1 -> in-process; None -> use all CPU cores
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024  # smaller workbooks are always tidied in-process
 # =============================================
 
+_WS = re.compile(r"\s+")
+# RE2 spelling of Python's Unicode \s for the Arrow kernels; a compiled
+# pattern would send .str.replace back to the per-element Python path
+_WS_ARROW = r"[\s\v\x1c-\x1f\x85\p{Z}]+"
+STRING_DTYPE = "string[pyarrow]"  # arrow-backed buffers for all text columns
+
+
+@lru_cache(maxsize=None)
+def level2_code_pattern(parent: str) -> re.Pattern:
+    """Compiled prefix pattern for Level-2 codes under a parent letter."""
+    return re.compile(rf"{re.escape(parent)}[A-Z]{{1,3}}")
+
 
 def normalize_cell(x) -> str:
     if pd.isna(x):
         return ""
     s = str(x).strip().replace("\n", " ").replace("\t", " ")
-    return re.sub(r"\s+", " ", s)
+    return _WS.sub(" ", s)
+
+
+def normalize_series(s: pd.Series) -> pd.Series:
+    """Column-wise equivalent of normalize_cell."""
+    return s.fillna("").astype(STRING_DTYPE).str.replace(_WS_ARROW, " ", regex=True).str.strip()
 
 
 def extract_level1_map(df_l1: pd.DataFrame) -> dict:
@@ -44,20 +73,20 @@ def tidy_letter_sheet(df: pd.DataFrame, sheet_name: str, l1_map: dict) -> pd.Dat
     comment_cols = df.columns[2:]
 
     # Normalize
-    for c in df.columns:
-        df[c] = df[c].map(normalize_cell)
+    df = df.apply(normalize_series)
 
     # Keep only rows where code looks like "EA", "EB", ...
-    mask = df[code_col].str.match(rf"{parent}[A-Z]{{1,3}}", na=False)
+    mask = df[code_col].str.match(level2_code_pattern(parent), na=False)
     df = df.loc[mask].copy()
 
     # Merge comments if any
     if comment_cols.any():
-        df["comments"] = (
-            df[comment_cols]
-            .apply(lambda r: " | ".join([x for x in r if x]), axis=1)
-            .replace({"": pd.NA})
-        )
+        parts = df[comment_cols]
+        joined = parts.iloc[:, 0].to_numpy(dtype=object)
+        for i in range(1, parts.shape[1]):
+            col = parts.iloc[:, i].to_numpy(dtype=object)
+            joined = np.where(col == "", joined, np.where(joined == "", col, joined + " | " + col))
+        df["comments"] = pd.Series(joined, index=df.index).replace({"": pd.NA})
     else:
         df["comments"] = pd.NA
 
@@ -70,53 +99,103 @@ def tidy_letter_sheet(df: pd.DataFrame, sheet_name: str, l1_map: dict) -> pd.Dat
             "comments": df["comments"],
         }
     )
-    return out
-
-
-def build_dictionary(xlsx_path: str, output_path: str) -> pd.DataFrame:
-    sheets = pd.read_excel(xlsx_path, sheet_name=None, dtype=str)
-
-    # Build Level 1 mapping
-    l1_sheet = sheets.get("Level 1")
-    if l1_sheet is None:
-        raise ValueError("No 'Level 1' sheet found in the Excel file.")
-    l1_map = extract_level1_map(l1_sheet)
-
-    # Process lettered sheets
-    pieces = []
-    for name, df in sheets.items():
-        if name == "Level 1":
-            continue
-        if len(name) == 1 and name.isalpha():
-            pieces.append(tidy_letter_sheet(df, name, l1_map))
-
-    df_all = pd.concat(pieces, ignore_index=True)
-
-    # Add convenience columns
-    df_all["level"] = 2
-    df_all["code"] = df_all["level2_code"]
-    df_all["name"] = df_all["level2_name"]
-    df_all["path"] = (
-        df_all["level1_code"]
-        + " "
-        + df_all["level1_name"].fillna("").str.strip()
-        + " > "
-        + df_all["level2_code"]
-        + " "
-        + df_all["level2_name"]
-    ).str.replace(r"\s+", " ", regex=True)
-
-    # Stable surrogate key
-    df_all = df_all.sort_values(["level1_code", "level2_code"], kind="stable").reset_index(drop=True)
-    df_all.insert(0, "hepa_id", df_all.index + 1)
-
-    # Write parquet
-    df_all.to_parquet(output_path, engine="pyarrow", compression="snappy")
-    return df_all
+    return out.sort_values("level2_code", kind="stable", ignore_index=True)
+
+
+def string_array(values) -> pa.Array:
+    """Arrow string array from an object array; NaN/NA become nulls."""
+    return pa.array(values, type=pa.string(), from_pandas=True)
+
+
+def tidy_sheet_from_file(xlsx_path: str, sheet_name: str, l1_map: dict) -> pd.DataFrame:
+    """Worker: read a single lettered sheet and return its tidy rows."""
+    df = pd.read_excel(xlsx_path, sheet_name=sheet_name, dtype=STRING_DTYPE, engine="calamine")
+    return tidy_letter_sheet(df, sheet_name, l1_map)
+
+
+def build_dictionary(xlsx_path: str, output_path: str) -> pa.Table:
+    with pd.ExcelFile(xlsx_path, engine="calamine") as xl:
+        sheet_names = xl.sheet_names
+
+        # Build Level 1 mapping
+        if "Level 1" not in sheet_names:
+            raise ValueError("No 'Level 1' sheet found in the Excel file.")
+        l1_map = extract_level1_map(xl.parse("Level 1", dtype=STRING_DTYPE))
+
+        letters = [n for n in sheet_names if n != "Level 1" and len(n) == 1 and n.isalpha()]
+        workers = min(MAX_WORKERS or os.cpu_count() or 4, max(1, len(letters)))
+        if os.path.getsize(xlsx_path) < PARALLEL_MIN_BYTES:
+            workers = 1
+
+        # Worker start-up (imports + reopening the workbook) outweighs the
+        # per-sheet work on small files, so tidy in-process from the open file
+        results = {}
+        if workers == 1:
+            for n in letters:
+                results[n] = tidy_letter_sheet(xl.parse(n, dtype=STRING_DTYPE), n, l1_map)
+
+    # Otherwise process lettered sheets in parallel, one sheet per task
+    if workers > 1:
+        ctx = (
+            mp.get_context("spawn") if sys.platform == "darwin"
+            else mp.get_context("forkserver")
+        )
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+            futs = {ex.submit(tidy_sheet_from_file, xlsx_path, n, l1_map): n for n in letters}
+            for fut in as_completed(futs):
+                results[futs[fut]] = fut.result()
+
+    # Sheet name == level1_code and each piece is sorted by level2_code,
+    # so concatenating in sheet-name order yields the final row order
+    pieces = [results[n] for n in sorted(letters)]
+
+    if not pieces:
+        raise ValueError("No lettered sheets found in the Excel file.")
+
+    # Stitch columns directly; avoids BlockManager consolidation in pd.concat
+    cols = pieces[0].columns
+    if all(p.columns.equals(cols) for p in pieces):
+        data = {c: np.concatenate([p[c].to_numpy() for p in pieces]) for c in cols}
+    else:
+        merged = pd.concat(pieces, ignore_index=True, sort=False)
+        data = {c: merged[c].to_numpy() for c in merged.columns}
+    n = len(data["level2_code"])
+
+    # Inputs are already normalized, so no whitespace-collapsing pass is needed
+    path = [
+        f"{c1} {n1} > {c2} {n2}" if isinstance(n1, str) and n1 else f"{c1} > {c2} {n2}"
+        for c1, n1, c2, n2 in zip(
+            data["level1_code"], data["level1_name"], data["level2_code"], data["level2_name"]
+        )
+    ]
+
+    # Build the Arrow table directly; level-1 columns repeat per sheet, so store
+    # them dictionary-encoded
+    tbl = pa.table(
+        {
+            "hepa_id": pa.array(np.arange(1, n + 1, dtype=np.int64)),  # stable surrogate key
+            "level1_code": string_array(data["level1_code"]).dictionary_encode(),
+            "level1_name": string_array(data["level1_name"]).dictionary_encode(),
+            "level2_code": string_array(data["level2_code"]),
+            "level2_name": string_array(data["level2_name"]),
+            "comments": string_array(data["comments"]),
+            "level": pa.array(np.full(n, 2, dtype=np.int64)),
+            "path": string_array(path),
+        }
+    )
+
+    pq.write_table(
+        tbl,
+        output_path,
+        compression=COMPRESSION or "none",
+        compression_level=1 if COMPRESSION == "zstd" else None,
+        use_dictionary=["level1_code", "level1_name"],
+    )
+    return tbl
 
 
 if __name__ == "__main__":
-    df = build_dictionary(INPUT_XLSX, OUTPUT_PARQUET)
-    print(f"✅ Wrote {len(df)} Level-2 HEPA codes to {OUTPUT_PARQUET}\n")
+    tbl = build_dictionary(INPUT_XLSX, OUTPUT_PARQUET)
+    print(f"✅ Wrote {tbl.num_rows} Level-2 HEPA codes to {OUTPUT_PARQUET}\n")
     print("First 20 rows:\n")
-    print(df.head(20).to_string(index=False))
+    print(tbl.slice(0, 20).to_pandas().to_string(index=False))
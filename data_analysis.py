@@ -4,10 +4,13 @@ Detect real populated rows per sheet in a large Excel workbook.
 
 Strategy:
 - A row is "populated" if ANY cell in that row is non-blank.
-- Scan bottom-up from the sheet's max_row until we find the last populated row.
+- Load the sheet's cell values into memory once (python-calamine).
+- Scan bottom-up in exponentially growing blocks (non-blank mask per block)
+  and stop at the first block that contains a populated row.
 - Report both Excel's max_row and the detected real row count.
 
-Safe for large sheets (1M rows).
+Handles large sheets (1M rows), but each sheet's used range is held in memory
+as Python lists while it is scanned, so peak memory grows with sheet size.
 Parallelised with processes (no threads).
 """
 
@@ -19,14 +22,16 @@ import multiprocessing as mp
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Dict
 
-import pandas as pd
+import numpy as np
 from openpyxl import load_workbook
+from python_calamine import CalamineWorkbook
 from tqdm import tqdm
 
 # -------- CONFIG --------
 INPUT_XLSX = "Data_Base.xlsx"
 OUTPUT_REPORT = "real_row_counts.md"
 HEADER_ROW = 1  # assumes header is first row; adjust if different
+FIRST_BLOCK_ROWS = 64  # bottom-up scan block size; doubles after each blank block
 MAX_WORKERS = None  # None -> use all CPU cores
 # ------------------------
 
@@ -44,24 +49,64 @@ logging.basicConfig(
 logger = logging.getLogger("real_row_counter")
 
 
+# Per-process workbook handles, opened once by the pool initializer:
+# calamine for cell values, openpyxl (read-only) for declared sheet dimensions
+_WB = None
+_XL = None
+_WB_PATH = None
+
+
+def _init_worker(path: str):
+    global _WB, _XL, _WB_PATH
+    _WB = CalamineWorkbook.from_path(path)
+    _XL = load_workbook(path, read_only=True, data_only=True)
+    _WB_PATH = path
+
+
+def _last_populated_index(rows: list, start: int) -> int:
+    """Index of the last populated row in rows[start:], or -1 if none.
+
+    rows is already fully materialised, so this only bounds the masking work:
+    blocks are taken from the bottom and double in size while they come back
+    blank, so rows above the last populated block are never masked. Every row
+    is covered, so interior gaps never hide data (unlike a pure bisection).
+    """
+    hi = len(rows)
+    step = FIRST_BLOCK_ROWS
+    while hi > start:
+        lo = max(start, hi - step)
+        arr = np.array(rows[lo:hi], dtype=object)
+        nonblank = (arr != None) & (arr != "") & (arr != " ")  # noqa: E711
+        idx = np.flatnonzero(nonblank.any(axis=1))
+        if idx.size:
+            return lo + int(idx[-1])
+        hi = lo
+        step *= 2
+    return -1
+
+
 def detect_last_populated_row(path: str, sheet: str, header_row: int) -> Dict:
-    """Detect last populated row in a sheet (bottom-up scan)."""
+    """Detect last populated row in a sheet (galloping bottom-up block scan)."""
     started = time.time()
-    wb = load_workbook(path, read_only=True, data_only=True)
-    ws = wb[sheet]
+    cached = _WB_PATH == path
+    wb = _WB if cached else CalamineWorkbook.from_path(path)
+    xl = _XL if cached else load_workbook(path, read_only=True, data_only=True)
+    ws = wb.get_sheet_by_name(sheet)
 
-    max_row = ws.max_row or 0
-    max_col = ws.max_column or 0
+    # rows are materialised from A1 by the Rust reader; empty cells come back as ""
+    rows = ws.to_python(skip_empty_area=False)
+    # Excel's declared max_row comes from the sheet's <dimension> tag (read-only
+    # openpyxl reads just that); calamine's used range omits formatted-only rows
+    max_row = xl[sheet].max_row or len(rows)
 
     last_populated = header_row
-    # scan bottom-up
-    for r in range(max_row, header_row, -1):
-        values = [ws.cell(row=r, column=c).value for c in range(1, max_col + 1)]
-        if any(v not in (None, "", " ") for v in values):
-            last_populated = r
-            break
+    idx = _last_populated_index(rows, header_row)
+    if idx >= 0:
+        last_populated = idx + 1
 
-    wb.close()
+    if not cached:
+        wb.close()
+        xl.close()
     elapsed = round(time.time() - started, 3)
 
     return {
@@ -75,17 +120,21 @@ def detect_last_populated_row(path: str, sheet: str, header_row: int) -> Dict:
 
 
 def analyze_workbook(path: str) -> Dict[str, Dict]:
-    xl = pd.ExcelFile(path, engine="openpyxl")
-    sheets = xl.sheet_names
+    # only the workbook index is read here; workers open their own handle
+    wb = CalamineWorkbook.from_path(path)
+    sheets = wb.sheet_names
+    wb.close()
 
     ctx = (
         mp.get_context("spawn") if sys.platform == "darwin"
         else mp.get_context("forkserver")
     )
-    workers = MAX_WORKERS or os.cpu_count() or 4
+    workers = min(MAX_WORKERS or os.cpu_count() or 4, max(1, len(sheets)))
 
     results = []
-    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(path,)
+    ) as ex:
         futs = {ex.submit(detect_last_populated_row, path, s, HEADER_ROW): s for s in sheets}
         for fut in tqdm(as_completed(futs), total=len(futs), desc="Sheets", unit="sheet"):
             results.append(fut.result())
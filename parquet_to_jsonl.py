@@ -6,25 +6,33 @@ Input:  proc_he_codes.parquet (from your previous step)
 Output: hepa_codes_slim.jsonl with fields: code, name, path
 """
 
-import pandas as pd
+import orjson
+import pyarrow.parquet as pq
 
 # === EDIT PATHS AS NEEDED ===
 INPUT_PARQUET = "proc_he_codes.parquet"
 OUTPUT_JSONL = "hepa_codes_slim.jsonl"
+# parquet column -> JSONL field; only these are decoded from the parquet
+SLIM_COLUMNS = {"level2_code": "code", "level2_name": "name", "path": "path"}
+BATCH_SIZE = 65536  # rows per record batch
 # =============================
 
 
 def make_slim_jsonl(input_path: str, output_path: str):
-    # Load full parquet
-    df = pd.read_parquet(input_path)
-
-    # Pick only the slim view
-    slim = df[["code", "name", "path"]].copy()
-
-    # Save as JSON Lines (one record per line)
-    slim.to_json(output_path, orient="records", lines=True, force_ascii=False)
-
-    print(f"✅ Wrote {len(slim)} records to {output_path}")
+    # Stream only the slim view, one record batch at a time
+    pf = pq.ParquetFile(input_path)
+    n_records = 0
+    with open(output_path, "wb") as f:
+        for batch in pf.iter_batches(batch_size=BATCH_SIZE, columns=list(SLIM_COLUMNS)):
+            batch = batch.rename_columns([SLIM_COLUMNS[c] for c in batch.schema.names])
+            rows = batch.to_pylist()
+            if not rows:
+                continue
+            # JSON Lines (one record per line); orjson appends the newline itself
+            f.write(b"".join(orjson.dumps(r, option=orjson.OPT_APPEND_NEWLINE) for r in rows))
+            n_records += len(rows)
+
+    print(f"✅ Wrote {n_records} records to {output_path}")
     print("\nFirst 10 lines:\n")
     with open(output_path, "r", encoding="utf-8") as f:
         for i, line in zip(range(10), f):